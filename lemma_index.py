@@ -0,0 +1,93 @@
+"""
+Index de lemmes français pour la détection des variantes de mots-clés.
+
+Les clés produites ici ne sont pas des lemmes au sens strict du dictionnaire:
+ce sont des clés de regroupement appliquées de façon symétrique aux mots-clés
+du guide et aux mots du texte (tous deux déjà passés par
+``normalize_text_for_search``, donc sans accents). Le singulier et le pluriel d'un
+même mot partagent la même clé; le féminin n'est pas rapproché du masculin, car
+sans accents ses règles confondent des mots distincts (entrée -> entre).
+
+- La table précalculée ``data/fr_lemmas.tsv`` couvre les pluriels irréguliers et
+  les mots invariables qui tromperaient les règles (yeux -> oeil, corps -> corps)
+- Les pluriels réguliers sont résolus par des règles de suffixes, mémorisées pour
+  que le chemin chaud se limite à un accès dict
+"""
+import os
+import sys
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+LEMMA_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fr_lemmas.tsv")
+
+# Longueur minimale d'un mot pour appliquer les règles de pluriel (évite bas -> ba, des -> de...)
+MIN_RULE_LENGTH = 4
+
+_lemma_table: Optional[Dict[str, str]] = None
+
+
+def load_lemma_table(path: str = LEMMA_TABLE_PATH) -> Dict[str, str]:
+    """
+    Charge la table forme -> lemme (une entrée ``forme<TAB>lemme`` par ligne).
+    La table est chargée une seule fois par processus; les lignes vides et les
+    commentaires (``#``) sont ignorés.
+    """
+    global _lemma_table
+    if _lemma_table is not None:
+        return _lemma_table
+
+    table: Dict[str, str] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                form, _sep, lemma = line.partition("\t")
+                if form and lemma:
+                    # Partager les chaînes de lemmes entre les formes pour limiter la mémoire
+                    table[form] = sys.intern(lemma)
+    except FileNotFoundError:
+        # Sans table, les règles de suffixes restent appliquées
+        table = {}
+
+    _lemma_table = table
+    return table
+
+
+def _strip_plural(token: str) -> str:
+    if token.endswith("eaux"):
+        return token[:-1]
+    if token.endswith("aux"):
+        return token[:-3] + "al"
+    if token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    # Les autres finales en -x (prix, choix, heureux) sont invariables
+    return token
+
+
+@lru_cache(maxsize=65536)
+def lemmatize(token: str) -> str:
+    """
+    Retourne la clé de lemme d'un mot normalisé (minuscules, sans accents).
+    """
+    table = _lemma_table if _lemma_table is not None else load_lemma_table()
+    lemma = table.get(token)
+    if lemma is not None:
+        return lemma
+    if len(token) < MIN_RULE_LENGTH:
+        return token
+
+    singular = _strip_plural(token)
+    return table.get(singular, singular)
+
+
+def lemmatize_tokens(tokens: List[str]) -> List[str]:
+    """
+    Lemmatise une liste de mots normalisés (ordre et longueur conservés).
+    """
+    return [lemmatize(token) for token in tokens]
+
+
+# Chargement unique à l'import, avant la première analyse
+load_lemma_table()
@@ -0,0 +1,127 @@
+"""
+Serveur local simulant les APIs Slashr Sémantique et Thot pour les tests de charge.
+
+Les guides servis sont dérivés de ``sample_response.json``. Latence, erreurs et
+timeouts sont injectables au démarrage (variables d'environnement) ou à chaud
+via ``POST /_control``, ce qui permet aux scénarios de simuler une panne en
+cours de test.
+
+Lancement manuel:
+    uvicorn loadtest.fake_upstream:app --port 9100
+
+Puis côté application:
+    SLASHR_API_URL=http://127.0.0.1:9100 THOT_API_URL=http://127.0.0.1:9100/thot uvicorn main:app
+"""
+import asyncio
+import json
+import os
+import random
+from typing import Any, Dict
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_response.json")
+
+app = FastAPI(title="Fake Slashr/Thot upstream")
+
+
+class FaultConfig(BaseModel):
+    latency_ms: float = float(os.getenv("FAKE_LATENCY_MS", "50"))
+    jitter_ms: float = float(os.getenv("FAKE_JITTER_MS", "20"))
+    error_rate: float = float(os.getenv("FAKE_ERROR_RATE", "0"))
+    error_status: int = int(os.getenv("FAKE_ERROR_STATUS", "503"))
+    timeout_rate: float = float(os.getenv("FAKE_TIMEOUT_RATE", "0"))
+    # Durée de blocage d'une requête en "timeout" (doit dépasser le timeout client)
+    hang_seconds: float = float(os.getenv("FAKE_HANG_SECONDS", "60"))
+
+
+faults = FaultConfig()
+stats: Dict[str, int] = {}
+
+with open(SAMPLE_PATH, "r", encoding="utf-8") as f:
+    sample_guide: Dict[str, Any] = json.load(f)
+
+
+def _to_slashr_keywords(kw_list):
+    # sample_response.json: [keyword, min, importance, (max?)] -> format Slashr
+    keywords = []
+    for kw_info in kw_list:
+        min_freq = int(kw_info[1]) if len(kw_info) > 1 else 1
+        max_freq = int(kw_info[3]) if len(kw_info) > 3 else min_freq * 2
+        keywords.append({
+            "keyword": kw_info[0],
+            "frequency": max_freq,
+            "importance": int(kw_info[2]) if len(kw_info) > 2 else 1,
+            "min_freq": min_freq,
+            "max_freq": max_freq,
+        })
+    return keywords
+
+
+slashr_guide: Dict[str, Any] = {
+    "target_seo_score": sample_guide.get("score_target", 50),
+    "recommended_words": sample_guide.get("mots_requis", 800),
+    "required_keywords": _to_slashr_keywords(sample_guide.get("KW_obligatoires", [])),
+    "complementary_keywords": _to_slashr_keywords(sample_guide.get("KW_complementaires", [])),
+}
+
+
+async def _apply_faults(route: str) -> None:
+    stats[route] = stats.get(route, 0) + 1
+
+    if faults.timeout_rate and random.random() < faults.timeout_rate:
+        stats[f"{route}:timeout"] = stats.get(f"{route}:timeout", 0) + 1
+        await asyncio.sleep(faults.hang_seconds)
+
+    delay = faults.latency_ms + random.uniform(-faults.jitter_ms, faults.jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    if faults.error_rate and random.random() < faults.error_rate:
+        stats[f"{route}:error"] = stats.get(f"{route}:error", 0) + 1
+        raise HTTPException(status_code=faults.error_status, detail="Erreur injectée par le faux upstream")
+
+
+@app.get("/analyze/{query}")
+async def slashr_analyze(query: str, location: str = "France", language: str = "fr"):
+    """
+    Équivalent local de GET {SLASHR_API_URL}/analyze/{query}
+    """
+    await _apply_faults("slashr")
+    return {"query": query, **slashr_guide}
+
+
+@app.get("/thot")
+async def thot_guide(keywords: str, apikey: str = ""):
+    """
+    Équivalent local de l'API Thot (format sample_response.json)
+    """
+    await _apply_faults("thot")
+    return {**sample_guide, "query": keywords}
+
+
+@app.get("/_control")
+async def get_control():
+    return faults
+
+
+@app.post("/_control")
+async def set_control(config: FaultConfig):
+    """
+    Remplace la configuration d'injection de pannes
+    """
+    global faults
+    faults = config
+    return faults
+
+
+@app.get("/_stats")
+async def get_stats():
+    return stats
+
+
+@app.post("/_reset")
+async def reset_stats():
+    stats.clear()
+    return stats
@@ -0,0 +1,352 @@
+"""
+Harnais de test de charge de bout en bout pour /analyze, /order-guide-slashr et /order-guide.
+
+Par défaut, le harnais démarre le faux upstream (loadtest/fake_upstream.py) et
+l'application (main.py) pointant dessus, exécute les scénarios puis affiche, par
+endpoint: débit, latences p50/p95/p99 et taux d'erreur.
+
+Exemples:
+    python -m loadtest.run
+    python -m loadtest.run --scenario cold_cache_burst --burst 200
+    python -m loadtest.run --app-workers 4 --writers 100 --duration 60 --json report.json
+    python -m loadtest.run --target http://127.0.0.1:8000 --upstream http://127.0.0.1:9100
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PATH = os.path.join(REPO_ROOT, "sample_response.json")
+
+SCENARIOS = ("concurrent_writers", "cold_cache_burst", "upstream_outage")
+
+FILLER_WORDS = (
+    "le", "la", "les", "un", "une", "des", "pour", "avec", "dans", "est", "sont",
+    "très", "plus", "votre", "chaque", "entre", "après", "avant", "souvent",
+)
+
+
+# ---------------------------------------------------------------------------
+# Mesures
+# ---------------------------------------------------------------------------
+
+def record(results: Dict[str, Dict[str, Any]], endpoint: str, latency: float, ok: bool, status: Any) -> None:
+    entry = results.setdefault(endpoint, {"latencies": [], "errors": 0, "statuses": {}})
+    entry["latencies"].append(latency)
+    if not ok:
+        entry["errors"] += 1
+    entry["statuses"][str(status)] = entry["statuses"].get(str(status), 0) + 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    # Méthode du rang le plus proche
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(results: Dict[str, Dict[str, Any]], elapsed: float) -> Dict[str, Dict[str, Any]]:
+    summary = {}
+    for endpoint, entry in sorted(results.items()):
+        latencies = sorted(entry["latencies"])
+        count = len(latencies)
+        summary[endpoint] = {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "error_rate": round(entry["errors"] / count, 4) if count else 0.0,
+            "statuses": entry["statuses"],
+        }
+    return summary
+
+
+def print_summary(name: str, summary: Dict[str, Dict[str, Any]], elapsed: float, upstream_stats: Dict[str, int]) -> None:
+    print(f"\n=== {name} ({elapsed:.1f}s) ===")
+    header = f"{'endpoint':<22}{'req':>7}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erreurs':>9}  statuts"
+    print(header)
+    print("-" * len(header))
+    for endpoint, s in summary.items():
+        print(
+            f"{endpoint:<22}{s['requests']:>7}{s['throughput_rps']:>9}{s['p50_ms']:>10}"
+            f"{s['p95_ms']:>10}{s['p99_ms']:>10}{s['error_rate'] * 100:>8.1f}%  {s['statuses']}"
+        )
+    if upstream_stats:
+        print(f"Appels upstream: {upstream_stats}")
+
+
+# ---------------------------------------------------------------------------
+# Requêtes
+# ---------------------------------------------------------------------------
+
+async def timed_post(client: httpx.AsyncClient, results, endpoint: str, payload: Dict[str, Any]) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await client.post(endpoint, json=payload)
+    except httpx.HTTPError as e:
+        record(results, endpoint, time.perf_counter() - start, False, type(e).__name__)
+        return None
+    record(results, endpoint, time.perf_counter() - start, response.status_code < 400, response.status_code)
+    return response
+
+
+def load_guide_keywords() -> List[str]:
+    with open(SAMPLE_PATH, "r", encoding="utf-8") as f:
+        guide = json.load(f)
+    return [kw[0] for kw in guide.get("KW_obligatoires", []) + guide.get("KW_complementaires", [])]
+
+
+def grow_text(text: str, keywords: List[str], words: int = 40) -> str:
+    # Simule la frappe d'un rédacteur: ajoute une phrase mêlant mots-clés et mots outils
+    sentence = " ".join(
+        random.choice(keywords) if random.random() < 0.3 else random.choice(FILLER_WORDS)
+        for _ in range(words)
+    )
+    return f"{text} {sentence.capitalize()}."
+
+
+def unique_query(prefix: str) -> str:
+    return f"{prefix} {uuid.uuid4().hex[:8]}"
+
+
+async def upstream_call(upstream: Optional[str], method: str, path: str, payload: Optional[Dict[str, Any]] = None):
+    if not upstream:
+        return {}
+    async with httpx.AsyncClient(base_url=upstream, timeout=10.0) as client:
+        response = await client.request(method, path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+
+# ---------------------------------------------------------------------------
+# Scénarios
+# ---------------------------------------------------------------------------
+
+async def writer_loop(client, results, query: str, keywords: List[str], deadline: float, think_ms: float, max_words: int) -> None:
+    text = ""
+    while time.perf_counter() < deadline:
+        text = grow_text(text, keywords)
+        if len(text.split()) > max_words:
+            text = grow_text("", keywords)
+        await timed_post(client, results, "/analyze", {"text": text, "query": query})
+        if think_ms:
+            await asyncio.sleep(random.uniform(0, think_ms) / 1000)
+
+
+async def concurrent_writers(client, upstream, args) -> Dict[str, Dict[str, Any]]:
+    """
+    Nombreux rédacteurs éditant en parallèle sur quelques guides déjà en cache
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    keywords = load_guide_keywords()
+    queries = [unique_query("guide") for _ in range(args.guides)]
+    for query in queries:
+        await timed_post(client, results, "/order-guide-slashr", {"keywords": query, "location": "France"})
+
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(
+        writer_loop(client, results, random.choice(queries), keywords, deadline, args.think_ms, args.max_words)
+        for _ in range(args.writers)
+    ))
+    return results
+
+
+async def cold_cache_burst(client, upstream, args) -> Dict[str, Dict[str, Any]]:
+    """
+    Rafale simultanée sur une requête jamais vue (cache froid): /order-guide-slashr et /analyze
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    keywords = load_guide_keywords()
+    query = unique_query("rafale")
+    text = grow_text(grow_text("", keywords), keywords)
+
+    calls = []
+    for i in range(args.burst):
+        if i % 2 == 0:
+            calls.append(timed_post(client, results, "/order-guide-slashr", {"keywords": query, "location": "France"}))
+        else:
+            calls.append(timed_post(client, results, "/analyze", {"text": text, "query": query}))
+    await asyncio.gather(*calls)
+    return results
+
+
+async def outage_phase(client, results, query: str, keywords: List[str], args) -> None:
+    deadline = time.perf_counter() + args.duration / 2
+
+    async def orderer(endpoint: str) -> None:
+        while time.perf_counter() < deadline:
+            if endpoint == "/order-guide":
+                payload = {"keywords": unique_query("thot")}
+            else:
+                payload = {"keywords": unique_query("panne"), "location": "France"}
+            await timed_post(client, results, endpoint, payload)
+
+    orderers = max(1, args.writers // 10)
+    await asyncio.gather(
+        *(writer_loop(client, results, query, keywords, deadline, args.think_ms, args.max_words)
+          for _ in range(args.writers)),
+        *(orderer("/order-guide-slashr") for _ in range(orderers)),
+        *(orderer("/order-guide") for _ in range(orderers)),
+    )
+
+
+async def upstream_outage(client, upstream, args) -> Dict[str, Dict[str, Any]]:
+    """
+    Panne upstream: erreurs HTTP puis timeouts, pendant que les rédacteurs continuent d'analyser
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    keywords = load_guide_keywords()
+    query = unique_query("guide")
+    await timed_post(client, results, "/order-guide-slashr", {"keywords": query, "location": "France"})
+
+    previous = await upstream_call(upstream, "GET", "/_control")
+    try:
+        await upstream_call(upstream, "POST", "/_control", {**previous, "error_rate": 1.0, "timeout_rate": 0.0})
+        await outage_phase(client, results, query, keywords, args)
+        await upstream_call(upstream, "POST", "/_control", {**previous, "error_rate": 0.0, "timeout_rate": 1.0})
+        await outage_phase(client, results, query, keywords, args)
+    finally:
+        await upstream_call(upstream, "POST", "/_control", previous)
+    return results
+
+
+SCENARIO_FUNCS = {
+    "concurrent_writers": concurrent_writers,
+    "cold_cache_burst": cold_cache_burst,
+    "upstream_outage": upstream_outage,
+}
+
+
+# ---------------------------------------------------------------------------
+# Processus locaux
+# ---------------------------------------------------------------------------
+
+def start_server(args_list: List[str], env: Dict[str, str], url: str, health_path: str, log_file) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *args_list, "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env={**os.environ, **env},
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Le serveur {args_list[0]} s'est arrêté au démarrage")
+        try:
+            httpx.get(url + health_path, timeout=1.0)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"Le serveur {args_list[0]} ne répond pas sur {url}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Test de charge Content Writer avec faux upstream Slashr/Thot")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--target", help="URL d'une application déjà lancée (sinon main.py est démarré localement)")
+    parser.add_argument("--upstream", help="URL d'un faux upstream déjà lancé (sinon il est démarré localement)")
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--upstream-port", type=int, default=9100)
+    parser.add_argument("--app-workers", type=int, default=1, help="Nombre de workers uvicorn de l'application")
+    parser.add_argument("--upstream-latency-ms", type=float, default=200.0)
+    parser.add_argument("--upstream-timeout", type=float, default=2.0,
+                        help="Timeout Slashr/Thot de l'application démarrée localement (s)")
+    parser.add_argument("--writers", type=int, default=50)
+    parser.add_argument("--guides", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=20.0, help="Durée des scénarios continus (s)")
+    parser.add_argument("--think-ms", type=float, default=200.0, help="Pause max entre deux analyses d'un rédacteur")
+    parser.add_argument("--max-words", type=int, default=1500, help="Taille max du texte d'un rédacteur")
+    parser.add_argument("--burst", type=int, default=100, help="Nombre de requêtes de la rafale cache froid")
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--json", dest="json_path", help="Écrire le rapport complet dans ce fichier")
+    parser.add_argument("--server-log", help="Fichier recevant les logs des serveurs démarrés (ignorés par défaut)")
+    return parser.parse_args(argv)
+
+
+async def run_scenarios(args, target: str, upstream: Optional[str]) -> Dict[str, Any]:
+    report = {}
+    names = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=target, timeout=args.request_timeout, limits=limits) as client:
+        for name in names:
+            if name == "upstream_outage" and not upstream:
+                # Sans faux upstream pilotable, la panne ne peut pas être injectée
+                print(f"\n=== {name} ignoré: nécessite le faux upstream (--upstream) ===", file=sys.stderr)
+                continue
+            if upstream:
+                await upstream_call(upstream, "POST", "/_reset")
+            start = time.perf_counter()
+            results = await SCENARIO_FUNCS[name](client, upstream, args)
+            elapsed = time.perf_counter() - start
+            summary = summarize(results, elapsed)
+            upstream_stats = await upstream_call(upstream, "GET", "/_stats") if upstream else {}
+            print_summary(name, summary, elapsed, upstream_stats)
+            report[name] = {"elapsed_s": round(elapsed, 2), "endpoints": summary, "upstream": upstream_stats}
+    return report
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    processes = []
+    log_file = open(args.server_log, "a", encoding="utf-8") if args.server_log else subprocess.DEVNULL
+    try:
+        upstream = args.upstream
+        # Une application cible externe est supposée déjà configurée vers son upstream
+        if not upstream and not args.target:
+            upstream = f"http://127.0.0.1:{args.upstream_port}"
+            processes.append(start_server(
+                ["loadtest.fake_upstream:app", "--port", str(args.upstream_port)],
+                {
+                    "FAKE_LATENCY_MS": str(args.upstream_latency_ms),
+                    # Un "timeout" injecté doit dépasser le timeout upstream de l'application
+                    "FAKE_HANG_SECONDS": str(args.upstream_timeout * 2),
+                },
+                upstream, "/_stats", log_file,
+            ))
+
+        target = args.target
+        if not target:
+            target = f"http://127.0.0.1:{args.app_port}"
+            processes.append(start_server(
+                ["main:app", "--port", str(args.app_port), "--workers", str(args.app_workers)],
+                {
+                    "SLASHR_API_URL": upstream,
+                    "THOT_API_URL": f"{upstream}/thot",
+                    "SLASHR_TIMEOUT": str(args.upstream_timeout),
+                    "THOT_TIMEOUT": str(args.upstream_timeout),
+                },
+                target, "/", log_file,
+            ))
+
+        report = asyncio.run(run_scenarios(args, target, upstream))
+        if args.json_path:
+            with open(args.json_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                # Requêtes upstream encore bloquées par un timeout injecté
+                process.kill()
+        if args.server_log:
+            log_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
@@ -7,10 +7,13 @@ import json
 import urllib.parse
 import logging
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import unicodedata
-from fastapi.responses import FileResponse  # Ajoutez cette importation
+from functools import lru_cache
+from fastapi.responses import FileResponse, PlainTextResponse  # Ajoutez cette importation
 import os  # Ajoutez cette importation
+from lemma_index import lemmatize_tokens
+import profiling
 
 # Configuration du chemin de base pour le déploiement
 BASE_PATH = os.getenv("BASE_PATH", "/content-writer")
@@ -60,12 +63,29 @@ class SlashrGuideRequest(BaseModel):
     keywords: str
     location: str = "France"
 
+class ProfilingConfigRequest(BaseModel):
+    sample_rate: Optional[float] = None
+    max_profiles: Optional[int] = None
+
 # Modèle de données pour le cache (Slashr uniquement)
 slashr_cache: Dict[str, Any] = {}
 
 # Configuration de l'API Slashr Sémantique
-SLASHR_API_BASE_URL = "https://outils.agence-slashr.fr/semantique/api/v1"
-SLASHR_TIMEOUT = 30.0
+SLASHR_API_BASE_URL = os.getenv("SLASHR_API_URL", "https://outils.agence-slashr.fr/semantique/api/v1")
+SLASHR_TIMEOUT = float(os.getenv("SLASHR_TIMEOUT", "30.0"))
+
+# Configuration de l'API Thot
+THOT_API_ENDPOINT = os.getenv("THOT_API_URL", "https://api.thot-seo.fr")
+THOT_API_KEY = os.getenv("THOT_API_KEY", "")
+THOT_TIMEOUT = float(os.getenv("THOT_TIMEOUT", "120.0"))
+thot_cache: Dict[str, Any] = {}
+
+def strip_diacritics(text: str) -> str:
+    """
+    Retire les diacritiques (é -> e) en conservant la ponctuation
+    """
+    text = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
 
 def normalize_text_for_search(text: str) -> str:
     """
@@ -78,8 +98,7 @@ def normalize_text_for_search(text: str) -> str:
         return ""
 
     # Mise en minuscules et suppression des diacritiques (accent-insensible)
-    text = unicodedata.normalize('NFD', text.lower())
-    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    text = strip_diacritics(text.lower())
     # Remplacer guillemets/apostrophes par espaces
     text = re.sub(r"['\"\u2018\u2019\u201C\u201D\u201E\u201F\u00AB\u00BB]", ' ', text)
     # Tirets et underscores -> espaces
@@ -99,32 +118,14 @@ def count_keyword_occurrences(text: str, keyword: str) -> int:
     """
     if not keyword or not text:
         return 0
+    exact_count, _variant_count = count_keyword_forms(index_text_tokens(text), keyword)
+    return exact_count
 
-    normalized_text = normalize_text_for_search(text)
-    normalized_keyword = normalize_text_for_search(keyword)
-    if not normalized_keyword or not normalized_text:
-        return 0
-
-    # Étape 1: détection candidats (fenêtre glissante)
-    words = [w for w in normalized_text.split() if w]
-    kw_parts = [p for p in normalized_keyword.split() if p]
-    if not words or not kw_parts:
-        return 0
-
-    # Compte candidats
-    if len(kw_parts) == 1:
-        candidates_count = sum(1 for w in words if w == kw_parts[0])
-    else:
-        candidates_count = 0
-        k = len(kw_parts)
-        for i in range(len(words) - k + 1):
-            if all(words[i + j] == kw_parts[j] for j in range(k)):
-                candidates_count += 1
-
-    if candidates_count == 0:
-        return 0
 
-    # Étape 2: validation contextuelle sur texte original pour mots à risque
+def _validate_candidates(text: str, keyword: str, kw_parts: List[str], candidates_count: int) -> int:
+    """
+    Étape 2: validation contextuelle sur texte original pour mots à risque
+    """
     risky = ("'" in keyword) or ("-" in keyword) or (len(kw_parts) > 1)
     if not risky:
         return candidates_count
@@ -141,6 +142,114 @@ def count_keyword_occurrences(text: str, keyword: str) -> int:
     return min(candidates_count, valid_count) if valid_count > 0 else candidates_count
 
 
+@lru_cache(maxsize=16384)
+def get_keyword_lemmas(keyword: str) -> Tuple[str, ...]:
+    """
+    Retourne les clés de lemmes d'un mot-clé (calculées une fois, puis servies depuis un cache borné)
+    """
+    return tuple(lemmatize_tokens(normalize_text_for_search(keyword).split()))
+
+
+def index_guide_keywords(guide_data: Dict[str, Any]) -> None:
+    """
+    Précalcule les clés de lemmes de tous les mots-clés d'un guide
+    """
+    for kw_info in guide_data.get("KW_obligatoires", []) + guide_data.get("KW_complementaires", []):
+        keyword, _min_freq, _importance, _max_freq = _extract_kw_fields(kw_info)
+        if keyword:
+            get_keyword_lemmas(keyword)
+
+
+def index_text_tokens(text: str) -> Dict[str, Any]:
+    """
+    Tokenisation unique du texte pour l'analyse de tous les mots-clés d'un guide:
+    mots normalisés, clés de lemmes et positions de chaque mot / lemme.
+    """
+    words = normalize_text_for_search(text).split()
+    lemmas = lemmatize_tokens(words)
+    word_positions: Dict[str, List[int]] = {}
+    lemma_positions: Dict[str, List[int]] = {}
+    for i, (word, lemma) in enumerate(zip(words, lemmas)):
+        word_positions.setdefault(word, []).append(i)
+        lemma_positions.setdefault(lemma, []).append(i)
+    return {
+        "text": text,
+        "words": words,
+        "lemmas": lemmas,
+        "word_positions": word_positions,
+        "lemma_positions": lemma_positions,
+    }
+
+
+def _match_starts(tokens: List[str], positions: Dict[str, List[int]], parts) -> List[int]:
+    # Seules les positions du premier mot sont candidates, les suivants sont vérifiés un à un
+    starts = positions.get(parts[0], [])
+    k = len(parts)
+    if k == 1:
+        return starts
+    limit = len(tokens) - k
+    return [
+        i for i in starts
+        if i <= limit and all(tokens[i + j] == parts[j] for j in range(1, k))
+    ]
+
+
+def _validate_variants(indexed_text: Dict[str, Any], variant_starts: List[int], k: int) -> int:
+    """
+    Applique aux variantes d'une expression la même validation contextuelle que pour la forme exacte:
+    chaque forme rencontrée (ex. "prises de masse") doit se retrouver dans le texte sans ponctuation
+    entre ses mots. Le texte sans diacritiques est comparé aux mots normalisés de la forme.
+    """
+    words = indexed_text["words"]
+    surface_counts: Dict[Tuple[str, ...], int] = {}
+    for i in variant_starts:
+        surface = tuple(words[i:i + k])
+        surface_counts[surface] = surface_counts.get(surface, 0) + 1
+
+    if "plain_text" not in indexed_text:
+        indexed_text["plain_text"] = strip_diacritics(indexed_text["text"].lower())
+
+    valid_count = 0
+    for surface, count in surface_counts.items():
+        pattern = build_flexible_pattern(" ".join(surface))
+        try:
+            matches = re.findall(pattern, indexed_text["plain_text"], flags=re.UNICODE)
+        except re.error:
+            continue
+        # Pas de repli sur les candidats: une variante non confirmée n'est pas comptée
+        valid_count += min(count, len(matches))
+    return valid_count
+
+
+def count_keyword_forms(indexed_text: Dict[str, Any], keyword: str) -> Tuple[int, int]:
+    """
+    Compte les occurrences d'un mot-clé dans un texte déjà indexé (voir index_text_tokens).
+    Retourne (exact_count, variant_count):
+    - exact_count: occurrences exactes, validées sur le texte original (cf. count_keyword_occurrences)
+    - variant_count: formes singulier/pluriel partageant les mêmes lemmes, validées de la même façon
+    """
+    if not keyword or not indexed_text["words"]:
+        return 0, 0
+
+    kw_parts = normalize_text_for_search(keyword).split()
+    if not kw_parts:
+        return 0, 0
+
+    exact_starts = _match_starts(indexed_text["words"], indexed_text["word_positions"], kw_parts)
+    lemma_starts = _match_starts(indexed_text["lemmas"], indexed_text["lemma_positions"], get_keyword_lemmas(keyword))
+    # Toute occurrence exacte partage aussi les lemmes: le reste correspond aux variantes
+    exact_set = set(exact_starts)
+    variant_starts = [i for i in lemma_starts if i not in exact_set]
+
+    variant_count = len(variant_starts)
+    if variant_starts and len(kw_parts) > 1:
+        variant_count = _validate_variants(indexed_text, variant_starts, len(kw_parts))
+
+    if not exact_starts:
+        return 0, variant_count
+    return _validate_candidates(indexed_text["text"], keyword, kw_parts, len(exact_starts)), variant_count
+
+
 def build_flexible_pattern(original_keyword: str) -> str:
     """
     Construit un pattern regex flexible:
@@ -294,8 +403,108 @@ def calculate_simple_robust_score(kw_obligatoires_count, kw_complementaires_coun
 
 # Route supprimée - conflit avec read_index()
 
+def analyze_text_with_guide(text: str, query: str, guide_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Partie synchrone de /analyze: comptage des mots-clés et score SEO pour un guide donné
+    """
+    # Analyser le texte avec une détection améliorée des mots-clés
+    text_lower = text.lower()
+    # Tokenisation unique (mots + lemmes) partagée par tous les mots-clés
+    indexed_text = index_text_tokens(text_lower)
+    
+    # Compter les occurrences des mots-clés obligatoires
+    kw_obligatoires_count = {}
+    for kw_info in guide_data.get("KW_obligatoires", []):
+        keyword, min_required, importance, _max_required = _extract_kw_fields(kw_info)
+        
+        # Compter les occurrences exactes et les variantes singulier/pluriel du mot-clé
+        exact_count, variant_count = count_keyword_forms(indexed_text, keyword)
+        count = exact_count + variant_count
+        
+        # Debug: Afficher le résultat pour chaque mot-clé
+        if count > 0:
+            logger.info(f"✅ Mot-clé '{keyword}' trouvé {count} fois dont {variant_count} variantes (requis: {min_required})")
+        
+        kw_obligatoires_count[keyword] = {
+            "count": count,
+            "exact_count": exact_count,
+            "variant_count": variant_count,
+            "required": min_required,
+            "importance": importance,
+            "completed": count >= min_required
+        }
+    
+    # Compter les occurrences des mots-clés complémentaires
+    kw_complementaires_count = {}
+    for kw_info in guide_data.get("KW_complementaires", []):
+        keyword, min_required, importance, _max_required = _extract_kw_fields(kw_info)
+        
+        # Compter les occurrences exactes et les variantes singulier/pluriel du mot-clé
+        exact_count, variant_count = count_keyword_forms(indexed_text, keyword)
+        count = exact_count + variant_count
+        
+        kw_complementaires_count[keyword] = {
+            "count": count,
+            "exact_count": exact_count,
+            "variant_count": variant_count,
+            "required": min_required,
+            "importance": importance,
+            "completed": count >= min_required
+        }
+    
+    # Debug: Afficher les mots-clés chargés et le texte analysé
+    logger.info(f"=== DEBUG ANALYSE ===")
+    logger.info(f"Query: {query}")
+    logger.info(f"Texte analysé (premiers 200 caractères): {text[:200]}...")
+    logger.info(f"Nombre de mots-clés obligatoires: {len(guide_data.get('KW_obligatoires', []))}")
+    logger.info(f"Premiers 5 mots-clés obligatoires: {[kw[0] for kw in guide_data.get('KW_obligatoires', [])[:5]]}")
+    
+    # Calculer le nouveau score SEO robuste
+    score_data = calculate_simple_robust_score(kw_obligatoires_count, kw_complementaires_count, guide_data)
+    
+    # Vérifier les n-grams
+    ngrams = guide_data.get("ngrams", "").split(";")
+    ngrams_found = []
+    
+    for ngram in ngrams:
+        if ngram.lower() in text_lower:
+            ngrams_found.append(ngram)
+    
+    # Calculer la suroptimisation basée sur le malus_count
+    total_keywords = len(kw_obligatoires_count) + len(kw_complementaires_count)
+    malus_count = score_data["details"]["malus_count"]
+    
+    # Suroptimisation = pourcentage de mots-clés suroptimisés
+    suroptimisation = round((malus_count / total_keywords) * 100) if total_keywords > 0 else 0
+    max_suroptimisation = 100  # Maximum logique : 100% des mots-clés suroptimisés
+    
+    # Compter les mots (méthode améliorée)
+    words = re.findall(r'\b\w+\b', text_lower)
+    word_count = len(words)
+    mots_requis = guide_data.get("mots_requis", 0)
+    
+    return {
+        "score_seo": score_data["score_seo"],
+        "base_score": score_data["base_score"],
+        "malus": score_data["malus"],
+        "score_obligatoires": score_data["score_obligatoires"],
+        "score_complementaires": score_data["score_complementaires"],
+        "score_details": score_data["details"],
+        "kw_obligatoires": kw_obligatoires_count,
+        "kw_complementaires": kw_complementaires_count,
+        "ngrams_found": ngrams_found,
+        "suroptimisation": suroptimisation,
+        "max_suroptimisation": max_suroptimisation,
+        "word_count": word_count,
+        "mots_requis": mots_requis,
+        "premiers_mots": {
+            "count": min(word_count, 200),
+            "target": 200
+        }
+    }
+
 @app.post("/analyze")
-async def analyze_text(request: TextAnalysisRequest):
+async def analyze_text(request: TextAnalysisRequest, http_request: Request, http_response: Response):
     """
     Analyse le texte fourni et retourne les statistiques basées sur les mots-clés
     """
@@ -322,93 +531,18 @@ async def analyze_text(request: TextAnalysisRequest):
                 with open("sample_response.json", "r", encoding="utf-8") as f:
                     guide_data = json.load(f)
         
-        # Analyser le texte avec une détection améliorée des mots-clés
-        text_lower = request.text.lower()
-        
-        # Compter les occurrences des mots-clés obligatoires
-        kw_obligatoires_count = {}
-        for kw_info in guide_data.get("KW_obligatoires", []):
-            keyword, min_required, importance, _max_required = _extract_kw_fields(kw_info)
-            
-            # Compter les occurrences du mot-clé dans le texte avec une méthode robuste
-            count = count_keyword_occurrences(text_lower, keyword)
-            
-            # Debug: Afficher le résultat pour chaque mot-clé
-            if count > 0:
-                logger.info(f"✅ Mot-clé '{keyword}' trouvé {count} fois (requis: {required_count})")
-            
-            kw_obligatoires_count[keyword] = {
-                "count": count,
-                "required": min_required,
-                "importance": importance,
-                "completed": count >= min_required
-            }
+        # Profilage à la demande (échantillonné ou via en-tête admin), désactivé par défaut
+        trigger = profiling.profile_trigger(http_request.headers)
+        if trigger:
+            metadata, captured_input = profiling.capture_input(request.query, request.text)
+            result, profile_id = profiling.profile_call(
+                analyze_text_with_guide, request.text, request.query, guide_data,
+                trigger=trigger, metadata=metadata, captured_input=captured_input,
+            )
+            http_response.headers[profiling.PROFILE_ID_HEADER] = profile_id
+            return result
         
-        # Compter les occurrences des mots-clés complémentaires
-        kw_complementaires_count = {}
-        for kw_info in guide_data.get("KW_complementaires", []):
-            keyword, min_required, importance, _max_required = _extract_kw_fields(kw_info)
-            
-            # Compter les occurrences du mot-clé dans le texte avec une méthode robuste
-            count = count_keyword_occurrences(text_lower, keyword)
-            
-            kw_complementaires_count[keyword] = {
-                "count": count,
-                "required": min_required,
-                "importance": importance,
-                "completed": count >= min_required
-            }
-        
-        # Debug: Afficher les mots-clés chargés et le texte analysé
-        logger.info(f"=== DEBUG ANALYSE ===")
-        logger.info(f"Query: {request.query}")
-        logger.info(f"Texte analysé (premiers 200 caractères): {request.text[:200]}...")
-        logger.info(f"Nombre de mots-clés obligatoires: {len(guide_data.get('KW_obligatoires', []))}")
-        logger.info(f"Premiers 5 mots-clés obligatoires: {[kw[0] for kw in guide_data.get('KW_obligatoires', [])[:5]]}")
-        
-        # Calculer le nouveau score SEO robuste
-        score_data = calculate_simple_robust_score(kw_obligatoires_count, kw_complementaires_count, guide_data)
-        
-        # Vérifier les n-grams
-        ngrams = guide_data.get("ngrams", "").split(";")
-        ngrams_found = []
-        
-        for ngram in ngrams:
-            if ngram.lower() in text_lower:
-                ngrams_found.append(ngram)
-        
-        # Calculer la suroptimisation basée sur le malus_count
-        total_keywords = len(kw_obligatoires_count) + len(kw_complementaires_count)
-        malus_count = score_data["details"]["malus_count"]
-        
-        # Suroptimisation = pourcentage de mots-clés suroptimisés
-        suroptimisation = round((malus_count / total_keywords) * 100) if total_keywords > 0 else 0
-        max_suroptimisation = 100  # Maximum logique : 100% des mots-clés suroptimisés
-        
-        # Compter les mots (méthode améliorée)
-        words = re.findall(r'\b\w+\b', text_lower)
-        word_count = len(words)
-        mots_requis = guide_data.get("mots_requis", 0)
-        
-        return {
-            "score_seo": score_data["score_seo"],
-            "base_score": score_data["base_score"],
-            "malus": score_data["malus"],
-            "score_obligatoires": score_data["score_obligatoires"],
-            "score_complementaires": score_data["score_complementaires"],
-            "score_details": score_data["details"],
-            "kw_obligatoires": kw_obligatoires_count,
-            "kw_complementaires": kw_complementaires_count,
-            "ngrams_found": ngrams_found,
-            "suroptimisation": suroptimisation,
-            "max_suroptimisation": max_suroptimisation,
-            "word_count": word_count,
-            "mots_requis": mots_requis,
-            "premiers_mots": {
-                "count": min(word_count, 200),
-                "target": 200
-            }
-        }
+        return analyze_text_with_guide(request.text, request.query, guide_data)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -454,6 +588,9 @@ def process_thot_data(data, query):
     if isinstance(data["questions"], list):
         data["questions"] = ";".join(data["questions"])
     
+    # Précalculer les lemmes des mots-clés pour la détection des variantes
+    index_guide_keywords(data)
+    
     return data
 
 def process_slashr_data(data: Dict[str, Any], query: str) -> Dict[str, Any]:
@@ -536,6 +673,9 @@ def process_slashr_data(data: Dict[str, Any], query: str) -> Dict[str, Any]:
         "concurrence": []
     }
     
+    # Précalculer les lemmes des mots-clés pour la détection des variantes
+    index_guide_keywords(processed_data)
+    
     return processed_data
 
 # Route supprimée - conflit avec read_index()
@@ -558,7 +698,7 @@ async def order_guide(request: GuideRequest):
         logger.info(f"URL de l'API: {api_url}")
         
         # Faire la requête à l'API Thot avec un timeout plus long
-        async with httpx.AsyncClient(timeout=120.0) as client:
+        async with httpx.AsyncClient(timeout=THOT_TIMEOUT) as client:
             logger.info("Envoi de la requête à l'API Thot...")
             try:
                 response = await client.get(api_url)
@@ -605,7 +745,7 @@ async def order_guide(request: GuideRequest):
                 return processed_data
             else:
                 # Log de l'erreur HTTP
-                error_content = await response.text()
+                error_content = response.text
                 logger.error(f"Erreur HTTP {response.status_code}: {error_content}")
                 raise HTTPException(status_code=response.status_code, 
                                    detail=f"Erreur lors de la commande du guide: {error_content}")
@@ -710,5 +850,51 @@ async def order_guide_slashr(request: SlashrGuideRequest):
         logger.error(f"=== FIN order_guide_slashr (échec Exception) ===")
         raise HTTPException(status_code=500, detail=f"Erreur interne: {str(e)}")
 
-# Montage des fichiers statiques déjà fait plus haut
+def _require_admin(http_request: Request) -> None:
+    if not profiling.is_admin(http_request.headers):
+        raise HTTPException(status_code=403, detail="Jeton admin manquant ou invalide")
+
+@app.get("/admin/profiling")
+async def get_profiling(http_request: Request):
+    """
+    Configuration du profilage et résumé des profils en mémoire (du plus récent au plus ancien)
+    """
+    _require_admin(http_request)
+    return {"config": profiling.get_config(), "profiles": profiling.list_profiles()}
 
+@app.post("/admin/profiling")
+async def configure_profiling(config: ProfilingConfigRequest, http_request: Request):
+    """
+    Active/désactive le profilage échantillonné (sample_rate entre 0 et 1) et dimensionne le buffer
+    """
+    _require_admin(http_request)
+    if config.sample_rate is not None and not 0 <= config.sample_rate <= 1:
+        raise HTTPException(status_code=400, detail="sample_rate doit être compris entre 0 et 1")
+    if config.max_profiles is not None and config.max_profiles < 1:
+        raise HTTPException(status_code=400, detail="max_profiles doit être supérieur ou égal à 1")
+    logger.info(f"Configuration du profilage: sample_rate={config.sample_rate}, max_profiles={config.max_profiles}")
+    return profiling.configure(config.sample_rate, config.max_profiles)
+
+@app.get("/admin/profiling/{profile_id}")
+async def download_profile(profile_id: str, http_request: Request, format: str = "pstats"):
+    """
+    Télécharge un profil: format=pstats (fichier binaire pour pstats/snakeviz), format=text,
+    ou format=input (corps JSON rejouable sur /analyze)
+    """
+    _require_admin(http_request)
+    entry = profiling.get_profile(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Profil introuvable: {profile_id}")
+    if format == "text":
+        return PlainTextResponse(profiling.format_pstats(entry))
+    if format == "input":
+        return entry["input"]
+    if format != "pstats":
+        raise HTTPException(status_code=400, detail="format doit valoir 'pstats', 'text' ou 'input'")
+    return Response(
+        content=profiling.dump_pstats(entry),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="analyze-{profile_id}.prof"'},
+    )
+
+# Montage des fichiers statiques déjà fait plus haut
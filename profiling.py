@@ -0,0 +1,200 @@
+"""
+Profilage à la demande des chemins chauds de l'analyse (désactivé par défaut).
+
+Un profil cProfile est capturé:
+- pour une fraction échantillonnée des requêtes (``PROFILING_SAMPLE_RATE``, modifiable
+  à chaud via l'endpoint d'administration)
+- pour une requête précise, via l'en-tête ``X-Profile: 1`` accompagné du jeton admin
+
+Les ``PROFILING_MAX_PROFILES`` derniers profils sont conservés en mémoire (buffer
+circulaire) et téléchargeables au format pstats depuis les endpoints d'administration.
+Quand le profilage est désactivé, le coût par requête se limite à une comparaison
+et à la lecture d'un en-tête.
+
+La configuration et le buffer sont propres à chaque processus: avec plusieurs
+workers uvicorn, chaque worker a son propre taux et ses propres profils (le pid
+du worker est exposé pour s'y retrouver).
+"""
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import marshal
+import os
+import pstats
+import random
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+ADMIN_TOKEN_HEADER = "x-admin-token"
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Fonctions résumées dans la liste des profils (le fichier pstats contient tout)
+HOT_PATH_FUNCTIONS = (
+    "analyze_text_with_guide",
+    "count_keyword_forms",
+    "count_keyword_occurrences",
+    "_validate_candidates",
+    "normalize_text_for_search",
+    "build_flexible_pattern",
+    "index_text_tokens",
+    "lemmatize_tokens",
+    "calculate_simple_robust_score",
+)
+
+# Taille maximale du texte conservé avec chaque profil pour rejouer la requête
+MAX_INPUT_CHARS = int(os.getenv("PROFILING_MAX_INPUT_CHARS", "20000"))
+
+sample_rate: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+profiles: Deque[Dict[str, Any]] = deque(maxlen=int(os.getenv("PROFILING_MAX_PROFILES", "20")))
+
+
+def is_admin(headers) -> bool:
+    """
+    Vérifie le jeton admin (endpoints d'administration désactivés si ADMIN_TOKEN est vide)
+    """
+    token = headers.get(ADMIN_TOKEN_HEADER)
+    if not ADMIN_TOKEN or token is None:
+        return False
+    # Comparaison en octets: compare_digest refuse les chaînes non ASCII (en-têtes décodés en latin-1)
+    return hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+
+def profile_trigger(headers) -> Optional[str]:
+    """
+    Retourne la raison du profilage de la requête ("header" ou "sample"), ou None
+    """
+    if headers.get(PROFILE_HEADER) == "1" and is_admin(headers):
+        return "header"
+    if sample_rate > 0 and random.random() < sample_rate:
+        return "sample"
+    return None
+
+
+def configure(new_sample_rate: Optional[float] = None, max_profiles: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Met à jour le taux d'échantillonnage et/ou la taille du buffer (les profils récents sont conservés)
+    """
+    global sample_rate, profiles
+    if new_sample_rate is not None:
+        sample_rate = new_sample_rate
+    if max_profiles is not None and max_profiles != profiles.maxlen:
+        profiles = deque(profiles, maxlen=max_profiles)
+    return get_config()
+
+
+def get_config() -> Dict[str, Any]:
+    return {
+        "worker_pid": os.getpid(),
+        "sample_rate": sample_rate,
+        "max_profiles": profiles.maxlen,
+        "stored_profiles": len(profiles),
+    }
+
+
+def capture_input(query: str, text: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Retourne (métadonnées, entrée rejouable) d'une requête /analyze: l'empreinte SHA-256
+    identifie le texte complet, le texte conservé est tronqué à MAX_INPUT_CHARS caractères.
+    """
+    metadata = {
+        "query": query,
+        "text_length": len(text),
+        "text_sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        "text_truncated": len(text) > MAX_INPUT_CHARS,
+    }
+    return metadata, {"query": query, "text": text[:MAX_INPUT_CHARS]}
+
+
+def _summarize(profiler: cProfile.Profile) -> List[Dict[str, Any]]:
+    summary = []
+    for (_filename, _lineno, funcname), (_cc, ncalls, tottime, cumtime, _callers) in profiler.stats.items():
+        if funcname in HOT_PATH_FUNCTIONS:
+            summary.append({
+                "function": funcname,
+                "ncalls": ncalls,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3),
+            })
+    summary.sort(key=lambda entry: entry["cumtime_ms"], reverse=True)
+    return summary
+
+
+def profile_call(
+    func: Callable[..., Any], *args, trigger: str, metadata: Dict[str, Any], captured_input: Dict[str, Any]
+) -> Tuple[Any, str]:
+    """
+    Exécute func(*args) sous cProfile et enregistre le profil dans le buffer, avec l'entrée
+    qui l'a produit (voir capture_input).
+    func doit être synchrone: un profil pris à travers un await mélangerait d'autres requêtes.
+    Retourne (résultat, identifiant du profil).
+    """
+    profile_id = uuid.uuid4().hex
+    profiler = cProfile.Profile()
+    error = None
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        return func(*args), profile_id
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        profiler.disable()
+        duration = time.perf_counter() - start
+        profiler.create_stats()
+        profiles.append({
+            "id": profile_id,
+            "worker_pid": os.getpid(),
+            "timestamp": time.time(),
+            "trigger": trigger,
+            "duration_ms": round(duration * 1000, 3),
+            "error": error,
+            "metadata": metadata,
+            "input": captured_input,
+            "functions": _summarize(profiler),
+            "profiler": profiler,
+        })
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """
+    Résumé des profils en mémoire, du plus récent au plus ancien (sans le texte capturé,
+    téléchargeable avec chaque profil)
+    """
+    return [
+        {key: value for key, value in entry.items() if key not in ("profiler", "input")}
+        for entry in reversed(profiles)
+    ]
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    for entry in profiles:
+        if entry["id"] == profile_id:
+            return entry
+    return None
+
+
+def dump_pstats(entry: Dict[str, Any]) -> bytes:
+    """
+    Sérialise un profil au format pstats (lisible par pstats.Stats, snakeviz...)
+    """
+    return marshal.dumps(entry["profiler"].stats)
+
+
+def format_pstats(entry: Dict[str, Any], limit: int = 50) -> str:
+    """
+    Rendu texte du profil, trié par temps cumulé, précédé des métadonnées et de l'entrée capturée
+    """
+    stream = io.StringIO()
+    stream.write(f"Profil {entry['id']} ({entry['trigger']}, {entry['duration_ms']} ms, worker {entry['worker_pid']})\n")
+    stream.write(f"Métadonnées: {json.dumps(entry['metadata'], ensure_ascii=False)}\n")
+    stream.write(f"Entrée: {json.dumps(entry['input'], ensure_ascii=False)}\n\n")
+    stats = pstats.Stats(entry["profiler"], stream=stream)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
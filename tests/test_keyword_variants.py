@@ -0,0 +1,77 @@
+import pytest
+
+from lemma_index import lemmatize
+from main import count_keyword_forms, count_keyword_occurrences, index_text_tokens
+
+
+def forms(text, keyword):
+    return count_keyword_forms(index_text_tokens(text.lower()), keyword)
+
+
+@pytest.mark.parametrize("token, expected", [
+    ("chaussures", "chaussure"),
+    ("chaussure", "chaussure"),
+    ("proteines", "proteine"),
+    ("principaux", "principal"),
+    ("eaux", "eau"),
+    ("beaux", "beau"),
+    ("yeux", "œil"),
+    ("travaux", "travail"),
+    ("jeux", "jeu"),
+    ("taux", "taux"),
+    ("corps", "corps"),
+    ("mois", "mois"),
+    ("des", "des"),
+])
+def test_lemmatize(token, expected):
+    assert lemmatize(token) == expected
+
+
+@pytest.mark.parametrize("first, second", [
+    ("entree", "entre"),
+    ("portee", "porte"),
+    ("duree", "dure"),
+    ("mois", "moi"),
+    ("fils", "fil"),
+    ("cours", "cour"),
+    ("baux", "bal"),
+])
+def test_lemmatize_keeps_distinct_words_apart(first, second):
+    assert lemmatize(first) != lemmatize(second)
+
+
+def test_plural_variants_of_multi_word_keyword():
+    text = "Des chaussures de randonnée légères. Une chaussure de randonnée."
+    assert forms(text, "chaussure de randonnée") == (1, 1)
+    assert forms(text, "chaussures de randonnée") == (1, 1)
+
+
+def test_punctuation_split_variant_is_rejected():
+    assert forms("prise. De masse, et prise de masse.", "prise de masse") == (1, 0)
+    assert forms("prises. De masse, et prise de masse.", "prise de masse") == (1, 0)
+    assert forms("Des prises de masse et une prise-de-masse.", "prise de masse") == (1, 1)
+
+
+@pytest.mark.parametrize("keyword, text", [
+    ("entrée", "Entre nous, entre amis, entre collègues."),
+    ("portée", "La porte est ouverte, fermez la porte."),
+    ("durée", "Le chantier dure longtemps."),
+])
+def test_no_variant_between_distinct_words(keyword, text):
+    assert forms(text, keyword) == (0, 0)
+
+
+def test_irregular_plurals_from_table():
+    assert forms("Il a les yeux bleus et un œil au beurre noir.", "œil") == (1, 1)
+    assert forms("Des travaux puis un travail soigné.", "travail") == (1, 1)
+
+
+@pytest.mark.parametrize("text, keyword, expected", [
+    ("La créatine, la CREATINE et les créatines.", "créatine", 2),
+    ("L'effet et l’effet, mais pas leffet.", "l'effet", 2),
+    ("Une prise de masse et une prise-de-masse.", "prise de masse", 2),
+    ("", "créatine", 0),
+    ("créatine", "", 0),
+])
+def test_count_keyword_occurrences(text, keyword, expected):
+    assert count_keyword_occurrences(text, keyword) == expected
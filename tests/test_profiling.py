@@ -0,0 +1,89 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import profiling
+
+QUERY = "test profilage"
+TEXT = "La créatine et les créatines, protéines whey. " * 20
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "sample_rate", 0.0)
+    monkeypatch.setattr(profiling, "profiles", profiling.deque(maxlen=5))
+    with open("sample_response.json", "r", encoding="utf-8") as f:
+        monkeypatch.setitem(main.slashr_cache, QUERY, json.load(f))
+    return TestClient(main.app)
+
+
+def analyze(client, headers=None):
+    return client.post("/analyze", json={"text": TEXT, "query": QUERY}, headers=headers or {})
+
+
+@pytest.mark.parametrize("headers", [
+    {},
+    {"X-Admin-Token": "wrong"},
+    {"X-Admin-Token": b"\xe9"},
+])
+def test_admin_endpoint_rejects_invalid_token(client, headers):
+    assert client.get("/admin/profiling", headers=headers).status_code == 403
+
+
+def test_admin_endpoint_disabled_without_configured_token(client, monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "")
+    assert client.get("/admin/profiling", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+@pytest.mark.parametrize("headers", [
+    {"X-Profile": "1"},
+    {"X-Profile": "1", "X-Admin-Token": "wrong"},
+    {"X-Profile": "1", "X-Admin-Token": b"\xe9"},
+])
+def test_profile_header_requires_admin_token(client, headers):
+    response = analyze(client, headers)
+    assert response.status_code == 200
+    assert profiling.PROFILE_ID_HEADER not in response.headers
+    assert len(profiling.profiles) == 0
+
+
+def test_profile_header_captures_profile_and_input(client):
+    response = analyze(client, {"X-Profile": "1", "X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    profile_id = response.headers[profiling.PROFILE_ID_HEADER]
+
+    admin = {"X-Admin-Token": "secret"}
+    listing = client.get("/admin/profiling", headers=admin).json()
+    entry = listing["profiles"][0]
+    assert entry["id"] == profile_id
+    assert entry["trigger"] == "header"
+    assert entry["metadata"]["text_length"] == len(TEXT)
+    assert "input" not in entry
+    assert any(f["function"] == "analyze_text_with_guide" for f in entry["functions"])
+
+    replay = client.get(f"/admin/profiling/{profile_id}?format=input", headers=admin).json()
+    assert replay == {"query": QUERY, "text": TEXT}
+    assert "analyze_text_with_guide" in client.get(f"/admin/profiling/{profile_id}?format=text", headers=admin).text
+    assert client.get(f"/admin/profiling/{profile_id}", headers=admin).content
+
+
+def test_sampling_configured_from_admin_endpoint(client):
+    admin = {"X-Admin-Token": "secret"}
+    assert client.post("/admin/profiling", json={"sample_rate": 2}, headers=admin).status_code == 400
+    config = client.post("/admin/profiling", json={"sample_rate": 1, "max_profiles": 2}, headers=admin).json()
+    assert config["sample_rate"] == 1 and config["max_profiles"] == 2
+
+    for _ in range(3):
+        assert profiling.PROFILE_ID_HEADER in analyze(client).headers
+    profiles = client.get("/admin/profiling", headers=admin).json()["profiles"]
+    assert [p["trigger"] for p in profiles] == ["sample", "sample"]
+
+
+def test_capture_input_truncates_long_text(monkeypatch):
+    monkeypatch.setattr(profiling, "MAX_INPUT_CHARS", 10)
+    metadata, captured_input = profiling.capture_input("q", "x" * 25)
+    assert metadata["text_length"] == 25 and metadata["text_truncated"]
+    assert captured_input == {"query": "q", "text": "x" * 10}